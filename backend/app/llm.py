@@ -1,148 +1,149 @@
 # backend/app/llm.py
 import os
+import re
 import json
-from typing import Any, Dict, List, Optional
-
-from pydantic import BaseModel, Field
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple, TypeVar
+
+from pydantic import BaseModel, Field, TypeAdapter
 from pydantic import ValidationError
 from google import genai
 from google.genai import types
 
+from . import llm_cache
 from .resume_schema import Resume
 
+logger = logging.getLogger(__name__)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
 
 class LLMEditProposal(BaseModel):
     assistant_message: str
     edits_summary: List[str] = Field(default_factory=list)
-    proposed_resume: Dict[str, Any]
+    proposed_resume: Resume
     needs_confirmation: bool = True
 
 
+class _LLMAdvice(BaseModel):
+    assistant_message: str
+
+
+# Built once at import so every request shares the compiled validators.
+_RESUME_ADAPTER = TypeAdapter(Resume)
+_PROPOSAL_ADAPTER = TypeAdapter(LLMEditProposal)
+_ADVICE_ADAPTER = TypeAdapter(_LLMAdvice)
+
+
+# Leading ``` / ```json fence; the closing fence is optional (truncated output).
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*(?:```|\Z)", re.DOTALL | re.IGNORECASE)
+
+
 def _strip_fences(text: str) -> str:
     value = (text or "").strip()
-    if value.startswith("```"):
-        parts = value.split("```")
-        value = parts[1].strip() if len(parts) > 1 else value
-        if value.lower().startswith("json"):
-            value = value[4:].strip()
-    return value
+    match = _FENCE_RE.match(value)
+    return match.group(1) if match else value
+
+
+_JSON_DECODER = json.JSONDecoder()
 
 
-def _extract_json_object(text: str) -> str:
+def _extract_json_object(text: str) -> Any:
     """
-    Pull the outermost JSON object from noisy model output.
-    Keeps strict schema validation later via Pydantic.
+    Decode the first JSON object in noisy model output (fences, leading prose,
+    trailing text). Keeps strict schema validation later via Pydantic.
     """
     s = _strip_fences(text)
     if not s:
         raise ValueError("empty response")
-    if s.startswith("{") and s.endswith("}"):
-        return s
 
     start = s.find("{")
     if start < 0:
         raise ValueError("no json object in response")
 
-    depth = 0
-    in_string = False
-    escaped = False
-    end = -1
-    for i, ch in enumerate(s[start:], start=start):
-        if escaped:
-            escaped = False
-            continue
-        if ch == "\\":
-            escaped = True
-            continue
-        if ch == '"':
-            in_string = not in_string
-            continue
-        if in_string:
-            continue
-        if ch == "{":
-            depth += 1
-        elif ch == "}":
-            depth -= 1
-            if depth == 0:
-                end = i
-                break
-
-    if end < 0:
-        raise ValueError("unterminated json object in response")
-    return s[start : end + 1]
+    obj, _ = _JSON_DECODER.raw_decode(s, start)
+    return obj
 
 
-def _parse_proposal_response(raw_text: str) -> LLMEditProposal:
-    payload = _extract_json_object(raw_text)
-    proposal = LLMEditProposal.model_validate_json(payload)
-    Resume.model_validate(proposal.proposed_resume)
-    return proposal
-
-
-def _build_parse_prompt(raw_text: str, seed_resume: Dict[str, Any]) -> str:
+def _validate_json_text(adapter: TypeAdapter[ModelT], raw_text: str) -> ModelT:
     """
-    Gemini should extract resume content into the Resume JSON schema.
-    It must return ONLY JSON matching the Resume schema below.
-    """
-    schema = {
-        "header": {
-            "name": "",
-            "email": "",
-            "phone": "",
-            "linkedin": "",
-            "github": "",
-            "portfolio": "",
-            "location": ""
-        },
-        "education": [
-            {"school": "", "degree": "", "major": "", "grad": "", "gpa": "", "coursework": []}
-        ],
-        "skills": {
-            "languages": [],
-            "frameworks": [],
-            "tools": [],
-            "concepts": [],
-            # IMPORTANT: make this a dict to match your “heading as key” rule
-            "categories": {}
-        },
-        "experience": [
-            {"company": "", "location": "", "role": "", "start": "", "end": "", "bullets": []}
-        ],
-        "projects": [
-            {"name": "", "link": "", "stack": [], "start": "", "end": "", "bullets": []}
-        ],
-        "leadership": [
-            {"org": "", "title": "", "start": "", "end": "", "bullets": []}
-        ],
-        "awards": []
-    }
+    Validate a JSON-mode response straight from the raw text; only fall back to
+    fence/brace extraction when the model still wrapped or padded its output.
+    """
+    try:
+        return adapter.validate_json(raw_text)
+    except ValidationError:
+        return adapter.validate_python(_extract_json_object(raw_text))
+
 
-    return f"""
+def _parse_proposal_response(raw_text: str) -> LLMEditProposal:
+    # proposed_resume is a nested Resume, so one pass validates the whole tree.
+    return _validate_json_text(_PROPOSAL_ADAPTER, raw_text)
+
+
+_PARSE_SCHEMA = {
+    "header": {
+        "name": "",
+        "email": "",
+        "phone": "",
+        "linkedin": "",
+        "github": "",
+        "portfolio": "",
+        "location": ""
+    },
+    "education": [
+        {"school": "", "degree": "", "major": "", "grad": "", "gpa": "", "coursework": []}
+    ],
+    "skills": {
+        "languages": [],
+        "frameworks": [],
+        "tools": [],
+        "concepts": [],
+        # IMPORTANT: make this a dict to match your “heading as key” rule
+        "categories": {}
+    },
+    "experience": [
+        {"company": "", "location": "", "role": "", "start": "", "end": "", "bullets": []}
+    ],
+    "projects": [
+        {"name": "", "link": "", "stack": [], "start": "", "end": "", "bullets": []}
+    ],
+    "leadership": [
+        {"org": "", "title": "", "start": "", "end": "", "bullets": []}
+    ],
+    "awards": []
+}
+
+# Static instruction blocks. Each prompt is sent as [instructions] + [dynamic tail]
+# so repeat calls share a byte-identical prefix Gemini can serve from its prompt cache.
+# Every block starts with _COMMON_RULES verbatim, so the shared head also stays
+# cached when a session switches between parsing, chat and tailoring.
+_COMMON_RULES = """
 Return ONLY valid JSON. No markdown. No commentary.
 
-You will be given:
-1) SEED_RESUME_JSON already extracted from the resume.
-2) RAW_RESUME_TEXT (raw text from the resume).
+Integrity rules:
+- Do NOT invent employers, schools, titles, dates, locations, metrics, links, awards, or projects.
+- Preserve original meaning; rephrase only for clarity, impact, and concision.
+""".strip()
 
-Your job:
-- PRESERVE all existing data in SEED_RESUME_JSON.
-- Fill missing/empty fields by extracting from RAW_RESUME_TEXT.
-- Do NOT remove or overwrite existing non-empty values
-  unless RAW_RESUME_TEXT explicitly corrects them.
+_PARSE_INSTRUCTIONS = _COMMON_RULES + "\n\n" + f"""
+You will be given RAW_RESUME_TEXT (raw text from the resume).
 
-If the user asks for a broad improvement like "make it professional", "polish it", "improve it":
-- Propose rewrites across ALL experience + project bullets (rewrite wording only, no new facts).
-- Set needs_confirmation=true
-- Provide edits_summary (strings describing what you changed)
+Your job:
+- Extract everything in RAW_RESUME_TEXT into the schema below.
 
 Output must EXACTLY match this JSON schema (same keys, correct types):
-{json.dumps(schema, indent=2)}
+{json.dumps(_PARSE_SCHEMA, indent=2)}
 
 Rules:
-- Do NOT invent employers, schools, titles, dates, locations, metrics, links, or awards.
 - If a field is missing, use "" or [] or {{}} as appropriate.
 - Split bullets into concise action-oriented statements.
-- Preserve original meaning; paraphrase only for clarity.
 - If unsure, leave empty.
 
 Skills parsing rule:
@@ -157,94 +158,36 @@ If a resume section does not match the schema exactly, map it to the closest sec
 - certifications -> awards
 - activities -> leadership
 - relevant coursework -> education.coursework
-
-SEED_RESUME_JSON:
-{json.dumps(seed_resume, indent=2)}
-
-RAW_RESUME_TEXT:
-{raw_text}
 """.strip()
 
-
-def _build_chat_prompt(
-    resume_json: Dict[str, Any],
-    user_message: str,
-    history: Optional[List[Dict[str, str]]] = None,
-) -> str:
-    """
-    Gemini should propose edits to an existing Resume JSON.
-    Must return ONLY JSON matching LLMEditProposal shape:
-    {
-      "assistant_message": "...",
-      "edits_summary": ["..."],
-      "proposed_resume": { ... Resume JSON ... },
-      "needs_confirmation": true/false
-    }
-    """
-    history = history or []
-
-    # Make history deterministic + safe
-    history_lines: List[str] = []
-    for turn in history[-12:]:  # keep it short
-        role = (turn.get("role") or "").strip().lower()
-        content = (turn.get("content") or "").strip()
-        if not content:
-            continue
-        if role not in ("user", "assistant"):
-            role = "user"
-        history_lines.append(f"{role.upper()}: {content}")
-
-    history_block = "\n".join(history_lines) if history_lines else "NONE"
-
-    return f"""
-Return ONLY valid JSON. No markdown. No commentary.
-
+_CHAT_INSTRUCTIONS = _COMMON_RULES + "\n\n" + """
 You are editing an existing resume represented as JSON (RESUME_JSON).
 You must produce an edit proposal in this exact shape:
 
-{{
+{
   "assistant_message": "brief explanation of what you changed and why",
   "edits_summary": ["short bullet-like strings describing changes"],
   "proposed_resume": <RESUME_JSON with edits applied>,
   "needs_confirmation": true
-}}
+}
 
 Rules:
-- Do NOT invent facts (companies, titles, dates, metrics, links).
 - You MAY rewrite bullets for clarity, impact, concision, and professionalism WITHOUT adding new facts.
 - Preserve structure and keys.
 - Only change fields relevant to the user's request.
 - If the request is broad ("polish", "make professional", "improve"), rewrite ALL experience + project bullets.
 - Default needs_confirmation=true unless user explicitly asked for an automatic rewrite and no factual risk exists.
-
-Conversation history:
-{history_block}
-
-Current RESUME_JSON:
-{json.dumps(resume_json, indent=2)}
-
-User request:
-{user_message}
+- RESUME_JSON may contain only the sections relevant to the request; return proposed_resume with exactly those sections.
+- Empty fields are omitted from RESUME_JSON; omitted keys mean "" / [] / {}.
 """.strip()
 
-def _build_job_tailor_prompt(
-    resume_json: Dict[str, Any],
-    job_description: str,
-) -> str:
-    """
-    Gemini should tailor resume language to a target job description
-    while preserving factual integrity.
-    """
-    return f"""
-Return ONLY valid JSON. No markdown. No commentary.
-
+_TAILOR_INSTRUCTIONS = _COMMON_RULES + "\n\n" + """
 You are tailoring an existing resume JSON object to align with a job posting.
 The resume JSON schema MUST remain identical.
 
 If the user says “make it professional / polish / improve”, you MUST propose edits across all experience + project bullets. Do NOT ask what to improve.
 
-Hard integrity rules:
-- Do NOT invent employers, schools, titles, dates, locations, links, awards, projects, or metrics.
+Tailoring rules:
 - Keep all existing experience factually consistent.
 - You MAY rephrase bullets to mirror the job description language and emphasize relevant accomplishments.
 - You MAY reorder bullets within an experience/project for relevance.
@@ -262,200 +205,641 @@ Return JSON with exactly these keys:
 - proposed_resume: full resume JSON object (same schema as CURRENT_RESUME_JSON)
 - needs_confirmation: boolean
 
+Empty fields are omitted from CURRENT_RESUME_JSON; omitted keys mean "" / [] / {}.
+
 Always set needs_confirmation=true.
 In assistant_message say: "I tailored your resume to this job description. Here are the edits I can make:" then list the edits and end with "Should I go ahead and make your new resume?".
+""".strip()
 
-CURRENT_RESUME_JSON:
-{json.dumps(resume_json, indent=2)}
+_ADVICE_INSTRUCTIONS = _COMMON_RULES + "\n\n" + """
+You are reviewing a resume represented as JSON (RESUME_JSON).
+The user is asking a question, not requesting edits. Answer it briefly with concrete,
+specific suggestions based on RESUME_JSON. Do NOT rewrite the resume.
+RESUME_JSON may contain only the sections the question is about, and empty fields are omitted.
 
-JOB_DESCRIPTION:
-{job_description}
+Return exactly: {"assistant_message": "your answer"}
 """.strip()
 
+# Per-request tails, filled with str.format.
+_PARSE_TAIL = "RAW_RESUME_TEXT:\n{raw_text}"
+# History goes first: it only grows between window resets, so consecutive turns
+# share the longest possible prompt prefix with each other.
+_CHAT_TAIL = (
+    "Conversation history:\n{history_block}\n\n"
+    "Current RESUME_JSON:\n{resume_json}\n\n"
+    "User request:\n{user_message}"
+)
+_TAILOR_TAIL = "CURRENT_RESUME_JSON:\n{resume_json}\n\nJOB_DESCRIPTION:\n{job_description}"
+
+_ROLE_LABELS = {"user": "USER", "assistant": "ASSISTANT"}
 
-def parse_resume_with_llm(raw_text: str, seed_resume: Dict[str, Any]) -> Resume:
+# The history window grows append-only up to _HISTORY_MAX turns, then its start jumps
+# forward by _HISTORY_STEP instead of sliding one turn per request.
+_HISTORY_MAX = 20
+_HISTORY_STEP = 10
+
+
+# Character budgets for the variable parts of a prompt (roughly 4 chars per token).
+_MAX_RAW_TEXT_CHARS = 24_000
+_MAX_JOB_DESCRIPTION_CHARS = 12_000
+_MAX_TURN_CHARS = 800
+_MAX_HISTORY_CHARS = 12_000
+
+
+def _budget(text: str, max_chars: int) -> str:
     """
-    Input: raw resume text
-    Output: Resume Pydantic model parsed with LLM
+    Keep the head and tail of an over-long input and cut the middle.
     """
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise RuntimeError("Missing GEMINI_API_KEY in environment (.env).")
+    if len(text) <= max_chars:
+        return text
+    half = max_chars // 2
+    return f"{text[:half]}\n...[TRUNCATED]...\n{text[-half:]}"
 
-    model = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
 
-    client = genai.Client(api_key=api_key)
-    prompt = _build_parse_prompt(raw_text, seed_resume)
+def history_window(history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    The turns a chat prompt can still see. The anchor only moves in _HISTORY_STEP
+    jumps, so callers may persist just this window and later windows come out the same.
+    """
+    anchor = max(0, (len(history) - _HISTORY_MAX + _HISTORY_STEP - 1) // _HISTORY_STEP * _HISTORY_STEP)
+    return history[anchor:]
+
+
+# Top-level resume sections a chat message can name explicitly. Only section names
+# go here; everyday words ("work", "name", "tools") would narrow broad requests.
+_SECTION_PATTERNS = {
+    section: re.compile(rf"\b(?:{words})\b", re.IGNORECASE)
+    for section, words in {
+        "header": r"header|e-?mail|phone|linkedin|github|portfolio|contact",
+        "education": r"education|school|university|college|degree|major|gpa|coursework|graduat\w*",
+        "skills": r"skills?|tech stack|technolog\w*|frameworks",
+        "experience": r"experiences?|internships?|employ\w*",
+        "projects": r"projects?",
+        "leadership": r"leadership",
+        "awards": r"awards?|certifications?|honou?rs?",
+        "extracurriculars": r"extracurriculars?|activities|volunteer\w*",
+    }.items()
+}
+# Requests that reach across the whole resume are never narrowed to one section.
+_WHOLE_RESUME_RE = re.compile(r"\b(?:resume|all|everything|bullets?)\b", re.IGNORECASE)
+
+
+# Questions ("what should I edit?", "how does it look?") get advice, not an edit plan;
+# anything that also asks for a change goes through the full proposal path.
+_QUESTION_RE = re.compile(
+    r"^\s*(?:what|which|how|why|where|should|is|are|does|do|any)\b.*\?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+_EDIT_VERB_RE = re.compile(
+    r"\b(?:rewrite|reword|rephrase|change|shorten|expand|add|remove|delete|fix|update|"
+    r"replace|make|polish|improve|tailor|tighten|condense)\b",
+    re.IGNORECASE,
+)
+
+
+def _is_advice_question(user_message: str) -> bool:
+    return bool(_QUESTION_RE.match(user_message)) and not _EDIT_VERB_RE.search(user_message)
+
+
+def _relevant_sections(resume: Resume, user_message: str) -> Optional[Set[str]]:
+    """
+    Sections the message clearly targets (by section keyword or by an entry name such
+    as a company or project), or None when the request is not section-specific.
+    """
+    if _WHOLE_RESUME_RE.search(user_message):
+        return None
 
-    resp = client.models.generate_content(
-        model=model,
-        contents=prompt,
-        config=types.GenerateContentConfig(
-            temperature=0.2,
-            max_output_tokens=4096,
-        ),
+    sections = {name for name, pattern in _SECTION_PATTERNS.items() if pattern.search(user_message)}
+
+    entry_names = (
+        ("experience", [e.company for e in resume.experience]),
+        ("projects", [p.name for p in resume.projects]),
+        ("education", [e.school for e in resume.education]),
+        ("leadership", [e.org for e in resume.leadership]),
+        ("extracurriculars", [e.org for e in resume.extracurriculars]),
     )
+    for section, names in entry_names:
+        # Whole words only, so "MIT" does not match "limit" or "Meta" "metadata".
+        if any(
+            len(n) >= 3 and re.search(rf"(?<!\w){re.escape(n)}(?!\w)", user_message, re.IGNORECASE)
+            for n in names
+        ):
+            sections.add(section)
 
-    payload = _extract_json_object(resp.text or "")
-    data: Any = json.loads(payload)
-    return Resume.model_validate(data)
+    if not sections or len(sections) == len(_SECTION_PATTERNS):
+        return None
+    return sections
 
 
-def propose_chat_edits(
-    resume: Resume,
-    user_message: str,
-    history: Optional[List[Dict[str, str]]] = None,
-) -> LLMEditProposal:
+def _prompt_contents(instructions: str, *tail: str) -> types.Content:
     """
-    Input: Resume Pydantic model (already parsed WITHOUT AI)
-    Output: LLM edit proposal and message for the user
-
-    Robustness:
-    - Calls Gemini once with the normal prompt
-    - If output fails JSON/schema validation, retries once with a strict "fix your JSON" prompt
-    - If still failing, returns a safe, non-crashing response
+    Single user turn: static instructions first, per-request parts after.
     """
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise RuntimeError("Missing GEMINI_API_KEY in environment (.env).")
+    parts = [types.Part(text=instructions)]
+    parts.extend(types.Part(text=t) for t in tail)
+    return types.Content(role="user", parts=parts)
 
-    model = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
-    client = genai.Client(api_key=api_key)
 
-    def _retry_prompt(previous_output: str, base_prompt: str) -> str:
-        return f"""
-You returned invalid JSON.
+_CLIENT: Optional[genai.Client] = None
+_CLIENT_LOCK = threading.Lock()
 
-Return ONLY valid JSON that matches the required response schema EXACTLY.
-No markdown. No commentary. No extra keys.
 
-Fix your previous output into valid JSON:
-{previous_output}
+def _get_client() -> genai.Client:
+    """
+    Process-wide Gemini client so HTTP connections are reused across requests.
+    """
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                api_key = os.environ.get("GEMINI_API_KEY")
+                if not api_key:
+                    raise RuntimeError("Missing GEMINI_API_KEY in environment (.env).")
+                _CLIENT = genai.Client(api_key=api_key)
+    return _CLIENT
+
 
-Original instructions:
-{base_prompt}
-""".strip()
+@lru_cache(maxsize=1)
+def _model_name() -> str:
+    return os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
 
-    base_prompt = _build_chat_prompt(resume.model_dump(), user_message, history)
 
-    # --- Attempt 1 ---
-    resp1 = client.models.generate_content(
-        model=model,
-        contents=base_prompt,
-        config=types.GenerateContentConfig(
-            temperature=0.2,
-            max_output_tokens=4096,
-            response_mime_type="application/json",
-        ),
-    )
+@lru_cache(maxsize=1)
+def _hedge_requests() -> bool:
+    return os.environ.get("GEMINI_HEDGE_REQUESTS", "").strip().lower() in {"1", "true", "yes"}
+
 
-    text1 = resp1.text or ""
+@lru_cache(maxsize=1)
+def _light_model_name() -> str:
+    return os.environ.get("GEMINI_LIGHT_MODEL") or _model_name()
 
+
+def _env_int(name: str, default: int) -> int:
+    # A malformed setting falls back to the default instead of failing every call.
     try:
-        return _parse_proposal_response(text1)
-    except ValidationError:
-        # fall through to retry
-        pass
-    except Exception:
-        # any other parsing error -> retry once
-        pass
-
-    # --- Attempt 2 (strict repair) ---
-    rp = _retry_prompt(text1, base_prompt)
-    resp2 = client.models.generate_content(
-        model=model,
-        contents=rp,
-        config=types.GenerateContentConfig(
-            temperature=0.0,
-            max_output_tokens=4096,
-            response_mime_type="application/json",
-        ),
+        return int(os.environ.get(name) or default)
+    except ValueError:
+        logger.warning("ignoring non-integer %s=%r", name, os.environ.get(name))
+        return default
+
+
+@lru_cache(maxsize=1)
+def _gemini_slots() -> asyncio.Semaphore:
+    # Caps in-flight Gemini calls per process so bursts queue here instead of hitting 429s.
+    return asyncio.Semaphore(max(1, _env_int("GEMINI_MAX_CONCURRENCY", 16)))
+
+
+_NEXT_CALL_AT = 0.0
+
+
+async def _pace() -> None:
+    """
+    Space call starts evenly when GEMINI_RPM is set, smoothing bursts under the quota.
+    """
+    global _NEXT_CALL_AT
+    rpm = _env_int("GEMINI_RPM", 0)
+    if rpm <= 0:
+        return
+    now = time.monotonic()
+    start = max(now, _NEXT_CALL_AT)
+    _NEXT_CALL_AT = start + 60.0 / rpm
+    if start > now:
+        await asyncio.sleep(start - now)
+
+
+async def _generate_text(
+    client: genai.Client,
+    model: str,
+    contents: List[types.Content],
+    config: types.GenerateContentConfig,
+) -> str:
+    """
+    One non-streaming call. The pinned SDK gives streaming calls a fresh httpx client
+    with the default 5s read timeout (and never closes it); this path has neither problem.
+    """
+    async with _gemini_slots():
+        await _pace()
+        response = await client.aio.models.generate_content(
+            model=model,
+            contents=contents,
+            config=config,
+        )
+    usage = response.usage_metadata
+    if usage is not None:
+        logger.debug(
+            "gemini %s tokens: prompt=%s cached=%s output=%s",
+            model,
+            usage.prompt_token_count,
+            usage.cached_content_token_count,
+            usage.candidates_token_count,
+        )
+    return response.text or ""
+
+
+async def _generate(
+    client: genai.Client,
+    model: str,
+    config: types.GenerateContentConfig,
+    instructions: str,
+    prompt: str,
+    followups: Sequence[types.Content] = (),
+) -> str:
+    """
+    Generate and return the response text. The static instructions lead the prompt so
+    Gemini's implicit prefix caching can reuse them. `followups` are later turns (e.g.
+    repair feedback).
+    """
+    return await _generate_text(
+        client,
+        model,
+        [_prompt_contents(instructions, prompt), *followups],
+        config,
     )
 
-    text2 = resp2.text or ""
 
+# Validated results of recent LLM calls keyed by a digest of (model, prompt), so an
+# identical repeat request (e.g. a UI retry) skips the Gemini round trip.
+# Values are shared between callers and must be treated as read-only.
+_RESPONSE_CACHE: "OrderedDict[bytes, Tuple[float, Any]]" = OrderedDict()
+_RESPONSE_CACHE_MAX = 256
+_RESPONSE_CACHE_TTL = 600.0
+_INFLIGHT: Dict[bytes, asyncio.Lock] = {}
+
+
+def _response_key(model: str, *prompt_parts: str) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    for part in (model, *prompt_parts):
+        data = part.encode("utf-8")
+        # Length-prefix each part so field boundaries can't collide.
+        h.update(len(data).to_bytes(8, "big"))
+        h.update(data)
+    return h.digest()
+
+
+def _response_cache_get(key: bytes) -> Any:
+    entry = _RESPONSE_CACHE.get(key)
+    if entry is None:
+        return None
+    stored_at, value = entry
+    if time.monotonic() - stored_at > _RESPONSE_CACHE_TTL:
+        del _RESPONSE_CACHE[key]
+        return None
+    _RESPONSE_CACHE.move_to_end(key)
+    return value
+
+
+def _response_cache_put(key: bytes, value: Any) -> None:
+    _RESPONSE_CACHE[key] = (time.monotonic(), value)
+    _RESPONSE_CACHE.move_to_end(key)
+    while len(_RESPONSE_CACHE) > _RESPONSE_CACHE_MAX:
+        _RESPONSE_CACHE.popitem(last=False)
+
+
+async def _memoized(key: bytes, produce: Callable[[], Awaitable[Optional[ModelT]]]) -> Optional[ModelT]:
+    """
+    Serve `key` from the response cache, else await `produce()` and cache a non-None result.
+    Concurrent misses for the same key wait for the first call instead of duplicating it.
+    """
+    hit = _response_cache_get(key)
+    if hit is not None:
+        return hit
+
+    lock = _INFLIGHT.setdefault(key, asyncio.Lock())
     try:
-        return _parse_proposal_response(text2)
-    except Exception:
-        # --- Final safe fallback (no crash, no loop) ---
-        return LLMEditProposal(
-            assistant_message=(
-                "I ran into a formatting issue generating the edit plan. "
-                "Try again with a broad command like:\n"
-                "- “Rewrite all my experience and project bullets to be more professional.”\n"
-                "- “Tighten my bullets to one line each, keeping the meaning the same.”"
-            ),
-            edits_summary=[],
-            proposed_resume=resume.model_dump(),
-            needs_confirmation=False,
-        )
+        async with lock:
+            hit = _response_cache_get(key)
+            if hit is not None:
+                return hit
+            value = await produce()
+            if value is not None:
+                _response_cache_put(key, value)
+            return value
+    finally:
+        if not lock.locked():
+            _INFLIGHT.pop(key, None)
+
+
+def _build_parse_prompt(raw_text: str) -> str:
+    """
+    Gemini should extract resume content into the Resume JSON schema.
+    It must return ONLY JSON matching the Resume schema in _PARSE_INSTRUCTIONS.
+    Returns the per-request tail (the raw text).
+    """
+    return _PARSE_TAIL.format(raw_text=_budget(raw_text, _MAX_RAW_TEXT_CHARS))
 
-def propose_job_tailored_edits(
-    resume: Resume,
+
+# Seed fields found by exact regex match (parser.py); the rest of the seed is a guess,
+# e.g. the name is just the first non-blank line.
+_PRECISE_SEED_FIELDS = frozenset({"email", "phone"})
+
+
+def _merge_preserve_seed(seed: Dict[str, Any], extracted: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Non-empty regex-precise seed values win; other seed values only fill fields the
+    LLM extraction left blank.
+    """
+    merged = dict(extracted)
+    for key, value in seed.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge_preserve_seed(value, merged[key])
+        elif value and (key in _PRECISE_SEED_FIELDS or not merged.get(key)):
+            merged[key] = value
+    return merged
+
+
+def _build_chat_prompt(
+    resume_json: str,
+    user_message: str,
+    history: Optional[List[Dict[str, str]]] = None,
+) -> str:
+    """
+    Gemini should propose edits to an existing Resume JSON.
+    Must return ONLY JSON matching LLMEditProposal shape:
+    {
+      "assistant_message": "...",
+      "edits_summary": ["..."],
+      "proposed_resume": { ... Resume JSON ... },
+      "needs_confirmation": true/false
+    }
+    Returns the per-request tail: history, then resume JSON, then the user request.
+    """
+    # Make history deterministic + safe; unknown roles are treated as the user.
+    lines = [
+        f"{_ROLE_LABELS.get((turn.get('role') or '').strip().lower(), 'USER')}: "
+        f"{_budget(content, _MAX_TURN_CHARS)}"
+        for turn in history_window(history or [])
+        if (content := (turn.get("content") or "").strip())
+    ]
+    # Oldest turns go first when the window is still over budget.
+    total = sum(len(line) + 1 for line in lines)
+    start = 0
+    while total > _MAX_HISTORY_CHARS and start < len(lines):
+        total -= len(lines[start]) + 1
+        start += 1
+    history_block = "\n".join(lines[start:]) or "NONE"
+
+    return _CHAT_TAIL.format(
+        resume_json=resume_json,
+        history_block=history_block,
+        user_message=user_message,
+    )
+
+def _build_job_tailor_prompt(
+    resume_json: str,
     job_description: str,
-) -> LLMEditProposal:
+) -> str:
     """
-    Input: Resume Pydantic model + raw job description text
-    Output: LLM edit proposal focused on job-tailored resume phrasing
+    Gemini should tailor resume language to a target job description
+    while preserving factual integrity.
+    Returns the per-request tail (resume JSON, then the job description).
     """
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        raise RuntimeError("Missing GEMINI_API_KEY in environment (.env).")
+    return _TAILOR_TAIL.format(
+        resume_json=resume_json,
+        job_description=_budget(job_description, _MAX_JOB_DESCRIPTION_CHARS),
+    )
+
 
-    model = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
+@lru_cache(maxsize=None)
+def _json_config(
+    temperature: float,
+    max_tokens: int,
+    schema: Optional[type] = None,
+) -> types.GenerateContentConfig:
+    """
+    Shared JSON-mode config per (temperature, max_tokens, schema); never mutate the result.
+    """
+    return types.GenerateContentConfig(
+        temperature=temperature,
+        max_output_tokens=max_tokens,
+        response_mime_type="application/json",
+        response_schema=schema,
+    )
 
-    client = genai.Client(api_key=api_key)
-    prompt = _build_job_tailor_prompt(resume.model_dump(), job_description)
 
-    def _retry_prompt(previous_output: str, base_prompt: str) -> str:
-        return f"""
-You returned invalid JSON.
+_REPAIR_NOTE = """
+Your previous output failed validation:
+{error}
 
-Return ONLY valid JSON that matches the required response schema EXACTLY.
+Return ONLY corrected JSON that matches the required response schema EXACTLY.
 No markdown. No commentary. No extra keys.
+""".strip()
+
+# Feedback rounds after a failed first attempt, and how much of the error to echo back.
+_REPAIR_ROUNDS = 2
+_REPAIR_ERROR_CHARS = 1_500
+
+
+async def _run_llm(
+    model: str,
+    instructions: str,
+    prompt: str,
+    parse: Callable[[str], ModelT],
+    *,
+    max_tokens: int = 4096,
+    repair: bool = True,
+    schema: Optional[type] = None,
+) -> Optional[ModelT]:
+    """
+    Generate JSON for `instructions` + `prompt` and validate it with `parse`.
+    `schema` turns on Gemini constrained decoding for models the SDK can express.
+    With GEMINI_HEDGE_REQUESTS enabled, a temperature-0 attempt runs alongside the first
+    one and whichever validates first wins.
+    If validation fails and `repair` is set, up to _REPAIR_ROUNDS follow-up turns at
+    temperature 0 send the validation error back to the model as feedback on its own
+    output. Returns None when every attempt fails validation; API errors propagate.
+    Identical requests are served from the response cache, backed by llm_cache in
+    object storage.
+    """
+    client = _get_client()
+
+    async def _try(
+        temperature: float,
+        followups: Sequence[types.Content] = (),
+    ) -> Tuple[str, Optional[ModelT], str]:
+        text = await _generate(
+            client,
+            model,
+            _json_config(temperature, max_tokens, schema),
+            instructions, prompt, followups,
+        )
+        try:
+            return text, parse(text), ""
+        except Exception as exc:
+            logger.warning("LLM output failed validation", exc_info=True)
+            return text, None, str(exc)[:_REPAIR_ERROR_CHARS]
+
+    async def _first_valid() -> Tuple[str, Optional[ModelT], str]:
+        if not _hedge_requests():
+            return await _try(0.2)
+
+        tasks = [asyncio.create_task(_try(0.2)), asyncio.create_task(_try(0.0))]
+        outcome: Optional[Tuple[str, Optional[ModelT], str]] = None
+        error: Optional[BaseException] = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    outcome = await next_done
+                except Exception as exc:
+                    error = error or exc
+                    continue
+                if outcome[1] is not None:
+                    return outcome
+        finally:
+            for task in tasks:
+                task.cancel()
+        if outcome is None:
+            raise error
+        return outcome
+
+    async def _attempts() -> Optional[ModelT]:
+        text, result, error = await _first_valid()
+        if not repair:
+            return result
+
+        followups: List[types.Content] = []
+        for _ in range(_REPAIR_ROUNDS):
+            if result is not None:
+                return result
+            followups += [
+                types.Content(role="model", parts=[types.Part(text=text)]),
+                types.Content(role="user", parts=[types.Part(text=_REPAIR_NOTE.format(error=error))]),
+            ]
+            text, result, error = await _try(0.0, followups)
+        return result
+
+    key = _response_key(model, instructions, prompt)
+    stored_key = key.hex()
+
+    async def _produce() -> Optional[ModelT]:
+        stored = await llm_cache.get(stored_key)
+        if stored is not None:
+            try:
+                return parse(stored.decode("utf-8"))
+            except Exception:
+                logger.warning("ignoring unreadable llm cache entry %s", stored_key, exc_info=True)
+        result = await _attempts()
+        if result is not None:
+            await llm_cache.put(stored_key, result.model_dump_json().encode("utf-8"))
+        return result
+
+    return await _memoized(key, _produce)
+
+
+async def parse_resume_with_llm(raw_text: str, seed_resume: Dict[str, Any]) -> Resume:
+    """
+    Input: raw resume text
+    Output: Resume Pydantic model parsed with LLM
 
-Fix your previous output into valid JSON:
-{previous_output}
+    A reply that fails schema validation gets the repair turns too, so one malformed
+    reply doesn't drop the upload to the bare name/email/phone seed.
+    """
+    # The seed is merged locally, which keeps the prompt shorter and independent of it.
+    prompt = _build_parse_prompt(raw_text)
+    extracted = await _run_llm(
+        _model_name(),
+        _PARSE_INSTRUCTIONS,
+        prompt,
+        lambda text: _validate_json_text(_RESUME_ADAPTER, text),
+    )
+    if extracted is None:
+        raise ValueError("LLM output did not match the resume schema")
+    return Resume.model_validate(_merge_preserve_seed(seed_resume, extracted.model_dump()))
 
-Original instructions:
-{base_prompt}
-""".strip()
 
-    resp1 = client.models.generate_content(
-        model=model,
-        contents=prompt,
-        config=types.GenerateContentConfig(
-            temperature=0.2,
-            max_output_tokens=4096,
-            response_mime_type="application/json",
+async def propose_chat_edits(
+    resume: Resume,
+    user_message: str,
+    history: Optional[List[Dict[str, str]]] = None,
+) -> LLMEditProposal:
+    """
+    Input: Resume Pydantic model (already parsed WITHOUT AI)
+    Output: LLM edit proposal and message for the user
+
+    Robustness:
+    - Calls Gemini once with the normal prompt
+    - If output fails JSON/schema validation, sends the error back for up to two repair turns
+    - If still failing, returns a safe, non-crashing response
+    - Identical repeat requests are served from the response cache
+    - Plain questions are answered by a short advice call without an edit plan
+    """
+    # Single-section requests only see (and may only change) that slice of the resume.
+    # The resume is serialized once and shared by the advice and edit prompts.
+    sections = _relevant_sections(resume, user_message)
+    prompt = _build_chat_prompt(
+        resume.model_dump_json(include=sections, exclude_defaults=True),
+        user_message,
+        history,
+    )
+
+    if _is_advice_question(user_message):
+        try:
+            advice = await _run_llm(
+                _light_model_name(),
+                _ADVICE_INSTRUCTIONS,
+                prompt,
+                lambda text: _validate_json_text(_ADVICE_ADAPTER, text),
+                max_tokens=512,
+                repair=False,
+                schema=_LLMAdvice,
+            )
+        except Exception:
+            logger.warning("advice call failed; falling back to full chat proposal", exc_info=True)
+            advice = None
+        if advice is not None:
+            # `resume` is already validated; model_construct skips re-validating it here
+            # and in the fallbacks below.
+            return LLMEditProposal.model_construct(
+                assistant_message=advice.assistant_message,
+                edits_summary=[],
+                proposed_resume=resume,
+                needs_confirmation=False,
+            )
+
+    # The response cache is keyed on the narrowed prompt only, so it must hold the raw
+    # proposal; splicing onto this caller's resume happens after the lookup.
+    proposal = await _run_llm(_model_name(), _CHAT_INSTRUCTIONS, prompt, _parse_proposal_response)
+    if proposal is not None:
+        if sections is None:
+            return proposal
+        edited = {name: getattr(proposal.proposed_resume, name) for name in sections}
+        return proposal.model_copy(update={"proposed_resume": resume.model_copy(update=edited)})
+
+    # --- Final safe fallback (no crash, no loop) ---
+    return LLMEditProposal.model_construct(
+        assistant_message=(
+            "I ran into a formatting issue generating the edit plan. "
+            "Try again with a broad command like:\n"
+            "- “Rewrite all my experience and project bullets to be more professional.”\n"
+            "- “Tighten my bullets to one line each, keeping the meaning the same.”"
         ),
+        edits_summary=[],
+        proposed_resume=resume,
+        needs_confirmation=False,
     )
 
-    text1 = resp1.text or ""
-    try:
-        return _parse_proposal_response(text1)
-    except Exception:
-        pass
-
-    resp2 = client.models.generate_content(
-        model=model,
-        contents=_retry_prompt(text1, prompt),
-        config=types.GenerateContentConfig(
-            temperature=0.0,
-            max_output_tokens=4096,
-            response_mime_type="application/json",
+async def propose_job_tailored_edits(
+    resume: Resume,
+    job_description: str,
+) -> LLMEditProposal:
+    """
+    Input: Resume Pydantic model + raw job description text
+    Output: LLM edit proposal focused on job-tailored resume phrasing
+    """
+    # Empty fields are left out of the prompt; they validate back to their defaults.
+    prompt = _build_job_tailor_prompt(
+        resume.model_dump_json(exclude_defaults=True),
+        job_description,
+    )
+    proposal = await _run_llm(_model_name(), _TAILOR_INSTRUCTIONS, prompt, _parse_proposal_response)
+    if proposal is not None:
+        return proposal
+
+    return LLMEditProposal.model_construct(
+        assistant_message=(
+            "I tailored your resume to this job description and prepared safe edits, "
+            "but formatting failed this time. Please retry once to regenerate."
         ),
+        edits_summary=[],
+        proposed_resume=resume,
+        needs_confirmation=False,
     )
-    text2 = resp2.text or ""
-    try:
-        return _parse_proposal_response(text2)
-    except Exception:
-        return LLMEditProposal(
-            assistant_message=(
-                "I tailored your resume to this job description and prepared safe edits, "
-                "but formatting failed this time. Please retry once to regenerate."
-            ),
-            edits_summary=[],
-            proposed_resume=resume.model_dump(),
-            needs_confirmation=False,
-        )
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from .storage import get_object_with_mtime, put_object
+
+logger = logging.getLogger(__name__)
+
+# Validated LLM results persisted next to the documents, so identical requests
+# still skip Gemini after a restart or on another worker. Keys are content hashes
+# of (model, instructions, prompt). Entries hold full resumes, so get() ignores
+# anything older than the TTL; a bucket lifecycle rule on the prefix deletes them
+# (see README).
+LLM_CACHE_PREFIX = "llm_cache"
+DEFAULT_LLM_CACHE_TTL = 7 * 86400
+
+
+def _cache_key(key: str) -> str:
+    return f"{LLM_CACHE_PREFIX}/{key}.json"
+
+
+def _cache_ttl() -> int:
+    try:
+        return int(os.environ.get("LLM_CACHE_TTL_SECONDS", str(DEFAULT_LLM_CACHE_TTL)))
+    except ValueError:
+        return DEFAULT_LLM_CACHE_TTL
+
+
+async def get(key: str) -> Optional[bytes]:
+    """
+    Stored JSON for `key`, or None on a miss, an expired entry, or when storage is
+    unavailable.
+    """
+    try:
+        data, modified = await asyncio.to_thread(get_object_with_mtime, _cache_key(key))
+    except Exception:
+        return None
+    if (datetime.now(timezone.utc) - modified).total_seconds() > _cache_ttl():
+        return None
+    return data
+
+
+async def put(key: str, data: bytes) -> None:
+    try:
+        await asyncio.to_thread(put_object, _cache_key(key), data, "application/json")
+    except Exception:
+        logger.warning("could not persist llm cache entry %s", key, exc_info=True)
@@ -1,41 +1,63 @@
 import os
 import uuid
-import json
+import asyncio
+import orjson
 import re
 import logging
-import os
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 from dotenv import load_dotenv
 from pydantic import BaseModel
-from fastapi import FastAPI, HTTPException, UploadFile
+from fastapi import FastAPI, HTTPException, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from .parse import extract_text
-from .storage import put_object, presigned_get_url, get_object_bytes
-from .models import UploadResumeResponse, PresignedUrlResponse, JobSearchResponse, JobResult, JobSearchRequest
+from .storage import aput_object, presigned_get_url, get_object_bytes, get_object
+from .models import UploadResumeResponse, PresignedUrlResponse, JobSearchResponse, JobSearchRequest
 from .resume_schema import Resume
 from .parser import parse_resume_text
-from .llm import propose_chat_edits, propose_job_tailored_edits
+from .llm import history_window, propose_chat_edits, propose_job_tailored_edits
 from .render import render_resume_to_latex
-from .theirstack import search_jobs, map_job
+from .theirstack import search_jobs, map_job, aclose as close_theirstack
 import io
+import time
+import weakref
 import zipfile
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import islice
+from contextlib import asynccontextmanager
 from pathlib import Path
 #Comment
 # Load environment variables FIRST
 load_dotenv()
 
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    yield
+    # Release pooled outbound HTTP connections on shutdown.
+    await close_theirstack()
+
+
 # Create FastAPI app BEFORE decorators
-app = FastAPI()
+app = FastAPI(lifespan=_lifespan, default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
 def _parse_allowed_origins() -> List[str]:
-        configured = os.getenv("CORS_ALLOWED_ORIGINS", "")
-        if configured.strip():
-                    return [origin.strip() for origin in configured.split(",") if origin.strip()]
+    # CORS_ALLOWED_ORIGINS is the documented setting; FRONTEND_ORIGINS is still honored
+    # for deployments that set it.
+    origins: List[str] = []
+    for name in ("CORS_ALLOWED_ORIGINS", "FRONTEND_ORIGINS"):
+        for origin in os.getenv(name, "").split(","):
+            origin = origin.strip().rstrip("/")
+            if origin and origin not in origins:
+                origins.append(origin)
+    if origins:
+        return origins
 
-        return [
+    return [
         "http://localhost:5173",
         "http://127.0.0.1:5173",
+        "http://localhost:3000",
         "https://seamstress-m6lai.ondigitalocean.app",
     ]
 
@@ -61,30 +83,146 @@ NO_CHANGE_RE = re.compile(
     r"\b(nothing|no changes?|looks good|looks fine|it'?s fine|leave it|leave as is|as is|we'?re good|all set|just export|ready to export|good as is)\b",
     re.IGNORECASE,
 )
+# The whole message is just a yes/no (optionally "thanks"), with no request attached.
+BARE_REPLY_RE = re.compile(
+    rf"\s*(?:{AFFIRMATIVE_RE.pattern}|{NEGATIVE_RE.pattern})(?:[\s,]+(?:thanks|thank you))?[\s.!]*",
+    re.IGNORECASE,
+)
+WORD_RE = re.compile(r"[a-zA-Z']+")
+
+# Keywords that expand a short (<= 3 word) chat message into a full instruction.
+BULLET_KEYS = frozenset({"bullet", "bullets", "bulleted"})
+POLISH_KEYS = frozenset({"professional", "polish", "improve", "improved", "better"})
+SKILLS_KEYS = frozenset({"skills", "skill", "stack"})
+
 def _is_no_change(message: str) -> bool:
-    return bool(NO_CHANGE_RE.search(message.lower()))
+    return bool(NO_CHANGE_RE.search(message))
 
-def _load_optional_json(key: str) -> Optional[Union[Dict[str, Any], List[Any]]]:
+async def _load_optional_json(key: str) -> Optional[Union[Dict[str, Any], List[Any]]]:
     try:
-        raw = get_object_bytes(key)
+        raw = await asyncio.to_thread(get_object_bytes, key)
     except Exception:
         return None
     try:
-        return json.loads(raw.decode("utf-8", errors="replace"))
+        return orjson.loads(raw)
     except Exception:
         return None
 
 
-def _save_json(key: str, payload: Union[Dict[str, Any], List[Any]]):
-    put_object(key, json.dumps(payload, indent=2).encode("utf-8"), "application/json")
+async def _save_json(key: str, payload: Union[Dict[str, Any], List[Any]]):
+    await aput_object(key, orjson.dumps(payload), "application/json")
+
+
+def _json_with_resume(payload: Dict[str, Any], resume_json: bytes) -> Response:
+    """
+    JSON response of `payload` plus a "resume" field spliced in from bytes that were
+    already serialized for storage, so the Resume is only dumped once per request.
+    """
+    head = orjson.dumps(payload)[:-1]
+    return Response(content=head + b', "resume": ' + resume_json + b"}", media_type="application/json")
+
+
+# Latest resume per doc_id (draft if present, else parsed) with the key it came from,
+# so repeat chat/tailor/export calls skip the storage walk. Entries are short-lived
+# to bound staleness across workers; cached Resumes must be treated as read-only.
+_RESUME_CACHE: "OrderedDict[str, Tuple[float, Resume, str, Optional[str]]]" = OrderedDict()
+_RESUME_CACHE_MAX = 1024
+_RESUME_CACHE_TTL = 300.0
+
+
+def _remember_resume(doc_id: str, resume: Resume, source_key: str, etag: Optional[str] = None) -> None:
+    _RESUME_CACHE[doc_id] = (time.monotonic(), resume, source_key, etag)
+    _RESUME_CACHE.move_to_end(doc_id)
+    while len(_RESUME_CACHE) > _RESUME_CACHE_MAX:
+        _RESUME_CACHE.popitem(last=False)
+
+
+async def _load_latest_resume(doc_id: str) -> Tuple[Resume, str]:
+    """
+    Returns (resume, source_key). Raises if neither a draft nor a parsed resume exists.
+    """
+    entry = _RESUME_CACHE.get(doc_id)
+    if entry is not None and time.monotonic() - entry[0] <= _RESUME_CACHE_TTL:
+        _RESUME_CACHE.move_to_end(doc_id)
+        return entry[1], entry[2]
+
+    draft_key = f"draft/{doc_id}/resume.json"
+    parsed_key = f"parsed/{doc_id}/resume.json"
+
+    def _fetch(key: str) -> Tuple[Optional[bytes], str]:
+        # Revalidate an expired entry with its ETag; a 304 skips the body and the re-parse.
+        etag = entry[3] if entry is not None and entry[2] == key else None
+        return get_object(key, if_none_match=etag)
+
+    try:
+        raw, etag = await asyncio.to_thread(_fetch, draft_key)
+        source_key = draft_key
+    except Exception:
+        raw, etag = await asyncio.to_thread(_fetch, parsed_key)
+        source_key = parsed_key
+
+    resume = entry[1] if raw is None else Resume.model_validate_json(raw)
+    _remember_resume(doc_id, resume, source_key, etag)
+    return resume, source_key
+
+
+# Chat and tailor turns read, then rewrite, the same draft/pending/history objects.
+# Serialize them per document so a quick second message waits for the first instead
+# of racing it (a lost update plus a wasted LLM call). Entries vanish once unused.
+_DOC_LOCKS: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _doc_lock(doc_id: str) -> asyncio.Lock:
+    lock = _DOC_LOCKS.get(doc_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _DOC_LOCKS[doc_id] = lock
+    return lock
+
+
+# Validated proposals awaiting confirmation, so the "yes" turn can apply the Resume
+# it already has instead of re-validating the stored dict. Storage stays the source
+# of truth: a missing or mismatched entry falls back to validating pending["resume"].
+_PENDING_CACHE: "OrderedDict[str, Tuple[str, Resume]]" = OrderedDict()
+_PENDING_CACHE_MAX = 1024
+
+
+def _pending_payload(
+    doc_id: str,
+    proposed: Resume,
+    proposed_resume: Dict[str, Any],
+    edits_summary: List[str],
+) -> Dict[str, Any]:
+    proposal_id = uuid.uuid4().hex
+    _PENDING_CACHE[doc_id] = (proposal_id, proposed)
+    _PENDING_CACHE.move_to_end(doc_id)
+    while len(_PENDING_CACHE) > _PENDING_CACHE_MAX:
+        _PENDING_CACHE.popitem(last=False)
+    return {
+        "status": "pending",
+        "proposal_id": proposal_id,
+        "resume": proposed_resume,
+        "edits_summary": edits_summary,
+    }
+
+
+def _pending_resume(doc_id: str, pending: Dict[str, Any]) -> Resume:
+    entry = _PENDING_CACHE.pop(doc_id, None)
+    if entry is not None and entry[0] == pending.get("proposal_id"):
+        return entry[1]
+    return Resume.model_validate(pending["resume"])
 
 
 def _is_affirmative(message: str) -> bool:
-    return bool(AFFIRMATIVE_RE.search(message.lower()))
+    return bool(AFFIRMATIVE_RE.search(message))
 
 
 def _is_negative(message: str) -> bool:
-    return bool(NEGATIVE_RE.search(message.lower()))
+    return bool(NEGATIVE_RE.search(message))
+
+
+def _is_bare_reply(message: str) -> bool:
+    return bool(BARE_REPLY_RE.fullmatch(message))
 
 
 def _normalize_chat_request(user_message: str) -> str:
@@ -92,21 +230,23 @@ def _normalize_chat_request(user_message: str) -> str:
     if not msg:
         return msg
 
-    lowered = msg.lower()
-    tokens = re.findall(r"[a-zA-Z']+", lowered)
-    short = len(tokens) <= 3
+    words = WORD_RE.findall(msg.lower())
+    if len(words) > 3:
+        return msg
+
+    tokens = frozenset(words)
 
-    if short and any(k in lowered for k in ("bullet", "bullets")):
+    if tokens & BULLET_KEYS:
         return (
             "Rewrite all experience and project bullets to be concise, professional, "
             "and ATS-friendly while preserving facts."
         )
-    if short and any(k in lowered for k in ("professional", "polish", "improve", "better")):
+    if tokens & POLISH_KEYS:
         return (
             "Polish my resume wording across all experience and project bullets without "
             "adding new facts."
         )
-    if short and any(k in lowered for k in ("skills", "tech stack", "stack")):
+    if tokens & SKILLS_KEYS:
         return (
             "Improve my resume skills section wording and organization while keeping all "
             "existing facts."
@@ -123,16 +263,17 @@ def health():
 @app.post("/api/resume", response_model=UploadResumeResponse)
 @app.post("/resume", response_model=UploadResumeResponse)
 async def upload_resume(file: UploadFile):
-    raw_text, raw_bytes = await extract_text(file)
+    raw_text, raw_file = await extract_text(file)
 
     doc_id = str(uuid.uuid4())
     filename = file.filename or "resume"
 
     upload_key = f"uploads/{doc_id}/{filename}"
-    put_object(upload_key, raw_bytes, file.content_type or "application/octet-stream")
-
     text_key = f"extracted/{doc_id}/resume.txt"
-    put_object(text_key, raw_text.encode("utf-8"), "text/plain; charset=utf-8")
+    await asyncio.gather(
+        aput_object(upload_key, raw_file, file.content_type or "application/octet-stream"),
+        aput_object(text_key, raw_text.encode("utf-8"), "text/plain; charset=utf-8"),
+    )
 
     return UploadResumeResponse(
         doc_id=doc_id,
@@ -153,22 +294,22 @@ async def get_extracted_text(doc_id: str):
 @app.post("/resume/{doc_id}/parse")
 async def parse_resume(doc_id: str):
     text_key = f"extracted/{doc_id}/resume.txt"
-    raw_text = get_object_bytes(text_key).decode("utf-8", errors="replace")
+    raw_text = (await asyncio.to_thread(get_object_bytes, text_key)).decode("utf-8", errors="replace")
 
-    resume = parse_resume_text(raw_text)
+    resume = await parse_resume_text(raw_text)
 
     parsed_key = f"parsed/{doc_id}/resume.json"
-    put_object(
-        parsed_key,
-        resume.model_dump_json(indent=2).encode("utf-8"),
-        "application/json",
+    draft_key = f"draft/{doc_id}/resume.json"
+    resume_json = resume.model_dump_json().encode("utf-8")
+    # A fresh parse becomes the working draft too, so the next /chat finds it on
+    # the first lookup (or straight from the cache) instead of missing on draft/.
+    await asyncio.gather(
+        aput_object(parsed_key, resume_json, "application/json"),
+        aput_object(draft_key, resume_json, "application/json"),
     )
+    _remember_resume(doc_id, resume, draft_key)
 
-    return {
-        "doc_id": doc_id,
-        "parsed_key": parsed_key,
-        "resume": resume.model_dump(),
-    }
+    return _json_with_resume({"doc_id": doc_id, "parsed_key": parsed_key}, resume_json)
 
 
 class ChatRequest(BaseModel):
@@ -182,36 +323,33 @@ class TailorResumeRequest(BaseModel):
 @app.post("/api/resume/{doc_id}/chat")
 @app.post("/resume/{doc_id}/chat")
 async def chat_resume(doc_id: str, req: ChatRequest):
+    async with _doc_lock(doc_id):
+        return await _chat_turn(doc_id, req)
+
+
+async def _chat_turn(doc_id: str, req: ChatRequest):
     draft_key = f"draft/{doc_id}/resume.json"
-    parsed_key = f"parsed/{doc_id}/resume.json"
     history_key = f"chat/{doc_id}/history.json"
     pending_key = f"draft/{doc_id}/pending.json"
 
     user_message = req.message.strip()
     normalized_user_message = _normalize_chat_request(user_message)
-    history: List[Dict[str, str]] = _load_optional_json(history_key) or []
-    pending = _load_optional_json(pending_key)
+    # Independent storage reads; run them concurrently.
+    history, pending, (resume, source_key) = await asyncio.gather(
+        _load_optional_json(history_key),
+        _load_optional_json(pending_key),
+        _load_latest_resume(doc_id),
+    )
+    # Older turns never reach a prompt again; dropping them keeps every history
+    # rewrite bounded instead of growing with the whole conversation.
+    history = history_window(history or [])
     pending_is_active = bool(pending and pending.get("status") == "pending")
 
-    try:
-        raw = get_object_bytes(draft_key)
-        source_key = draft_key
-    except Exception:
-        raw = get_object_bytes(parsed_key)
-        source_key = parsed_key
-
-    parsed_json = json.loads(raw.decode("utf-8", errors="replace"))
-    resume = Resume.model_validate(parsed_json)
-
     if pending_is_active and _is_affirmative(user_message):
-        updated = Resume.model_validate(pending["resume"])
-        put_object(
-            draft_key,
-            updated.model_dump_json(indent=2).encode("utf-8"),
-            "application/json",
-        )
+        updated = _pending_resume(doc_id, pending)
+        updated_json = updated.model_dump_json().encode("utf-8")
+        _remember_resume(doc_id, updated, draft_key)
         pending["status"] = "applied"
-        _save_json(pending_key, pending)
         assistant_message = "Great — I applied the edits and updated your resume. Want to export it now?"
         history.extend(
             [
@@ -219,20 +357,25 @@ async def chat_resume(doc_id: str, req: ChatRequest):
                 {"role": "assistant", "content": assistant_message},
             ]
         )
-        _save_json(history_key, history)
-        return {
-            "doc_id": doc_id,
-            "draft_key": draft_key,
-            "resume": updated.model_dump(),
-            "assistant_message": assistant_message,
-            "edits_summary": pending.get("edits_summary", []),
-            "needs_confirmation": False,
-            "status": "applied",
-        }
+        await asyncio.gather(
+            aput_object(draft_key, updated_json, "application/json"),
+            _save_json(pending_key, pending),
+            _save_json(history_key, history),
+        )
+        return _json_with_resume(
+            {
+                "doc_id": doc_id,
+                "draft_key": draft_key,
+                "assistant_message": assistant_message,
+                "edits_summary": pending.get("edits_summary", []),
+                "needs_confirmation": False,
+                "status": "applied",
+            },
+            updated_json,
+        )
 
     if pending_is_active and _is_negative(user_message):
         pending["status"] = "rejected"
-        _save_json(pending_key, pending)
         assistant_message = "No problem — tell me what you'd like to change next."
         history.extend(
             [
@@ -240,7 +383,10 @@ async def chat_resume(doc_id: str, req: ChatRequest):
                 {"role": "assistant", "content": assistant_message},
             ]
         )
-        _save_json(history_key, history)
+        await asyncio.gather(
+            _save_json(pending_key, pending),
+            _save_json(history_key, history),
+        )
         return {
             "doc_id": doc_id,
             "source_key": source_key,
@@ -250,7 +396,7 @@ async def chat_resume(doc_id: str, req: ChatRequest):
             "status": "rejected",
         }
     # If user explicitly says no changes needed
-    if _is_no_change(user_message) and not pending_is_active:
+    if not pending_is_active and _is_no_change(user_message):
         assistant_message = (
             "Got it — no changes needed. Want to export it now?"
         )
@@ -261,7 +407,28 @@ async def chat_resume(doc_id: str, req: ChatRequest):
                 {"role": "assistant", "content": assistant_message},
             ]
         )
-        _save_json(history_key, history)
+        await _save_json(history_key, history)
+
+        return {
+            "doc_id": doc_id,
+            "source_key": source_key,
+            "resume": resume.model_dump(),
+            "assistant_message": assistant_message,
+            "edits_summary": [],
+            "needs_confirmation": False,
+            "status": "info",
+        }
+    # A bare "yes"/"no" with nothing pending has nothing to act on; don't spend an LLM call.
+    if not pending_is_active and _is_bare_reply(user_message):
+        assistant_message = "There's no proposed edit waiting right now — tell me what you'd like to change."
+
+        history.extend(
+            [
+                {"role": "user", "content": user_message},
+                {"role": "assistant", "content": assistant_message},
+            ]
+        )
+        await _save_json(history_key, history)
 
         return {
             "doc_id": doc_id,
@@ -273,7 +440,7 @@ async def chat_resume(doc_id: str, req: ChatRequest):
             "status": "info",
         }
     try:
-        proposal = propose_chat_edits(resume, normalized_user_message, history)
+        proposal = await propose_chat_edits(resume, normalized_user_message, history)
     except Exception:
         logger.exception("chat proposal failed for doc_id=%s", doc_id)
         # Never crash on user input; return a safe message
@@ -290,7 +457,7 @@ async def chat_resume(doc_id: str, req: ChatRequest):
                 {"role": "assistant", "content": assistant_message},
             ]
         )
-        _save_json(history_key, history)
+        await _save_json(history_key, history)
 
         return {
             "doc_id": doc_id,
@@ -311,24 +478,23 @@ async def chat_resume(doc_id: str, req: ChatRequest):
             {"role": "assistant", "content": assistant_message},
         ]
     )
-    _save_json(history_key, history)
-
+    proposed_resume = proposal.proposed_resume.model_dump()
+    writes = [_save_json(history_key, history)]
     if proposal.needs_confirmation:
-        _save_json(
-            pending_key,
-            {
-                "status": "pending",
-                "resume": proposal.proposed_resume,
-                "edits_summary": proposal.edits_summary,
-            },
+        writes.append(
+            _save_json(
+                pending_key,
+                _pending_payload(doc_id, proposal.proposed_resume, proposed_resume, proposal.edits_summary),
+            )
         )
+    await asyncio.gather(*writes)
 
     return {
         "doc_id": doc_id,
         "source_key": source_key,
         "assistant_message": assistant_message,
         "edits_summary": proposal.edits_summary,
-        "proposed_resume": proposal.proposed_resume,
+        "proposed_resume": proposed_resume,
         "needs_confirmation": proposal.needs_confirmation,
         "status": "pending" if proposal.needs_confirmation else "info",
     }
@@ -337,33 +503,25 @@ async def chat_resume(doc_id: str, req: ChatRequest):
 @app.post("/api/resume/{doc_id}/tailor")
 @app.post("/resume/{doc_id}/tailor")
 async def tailor_resume_for_job(doc_id: str, req: TailorResumeRequest):
-    draft_key = f"draft/{doc_id}/resume.json"
-    parsed_key = f"parsed/{doc_id}/resume.json"
+    async with _doc_lock(doc_id):
+        return await _tailor_turn(doc_id, req)
+
+
+async def _tailor_turn(doc_id: str, req: TailorResumeRequest):
     pending_key = f"draft/{doc_id}/pending.json"
 
     job_description = req.job_description.strip()
     if not job_description:
         return {"error": "job_description is required"}
 
-    try:
-        raw = get_object_bytes(draft_key)
-        source_key = draft_key
-    except Exception:
-        raw = get_object_bytes(parsed_key)
-        source_key = parsed_key
-
-    parsed_json = json.loads(raw.decode("utf-8", errors="replace"))
-    resume = Resume.model_validate(parsed_json)
+    resume, source_key = await _load_latest_resume(doc_id)
 
-    proposal = propose_job_tailored_edits(resume, job_description)
+    proposal = await propose_job_tailored_edits(resume, job_description)
+    proposed_resume = proposal.proposed_resume.model_dump()
 
-    _save_json(
+    await _save_json(
         pending_key,
-        {
-            "status": "pending",
-            "resume": proposal.proposed_resume,
-            "edits_summary": proposal.edits_summary,
-        },
+        _pending_payload(doc_id, proposal.proposed_resume, proposed_resume, proposal.edits_summary),
     )
 
     return {
@@ -371,59 +529,58 @@ async def tailor_resume_for_job(doc_id: str, req: TailorResumeRequest):
         "source_key": source_key,
         "assistant_message": proposal.assistant_message,
         "edits_summary": proposal.edits_summary,
-        "proposed_resume": proposal.proposed_resume,
+        "proposed_resume": proposed_resume,
         "needs_confirmation": True,
         "status": "pending",
     }
 
 
+TEMPLATE_PATH = Path(__file__).parent / "latex" / "template.tex"
+
+
+@lru_cache(maxsize=1)
+def _template_tex() -> Optional[str]:
+    # The template ships with the code, so read it once per process.
+    if not TEMPLATE_PATH.exists():
+        logger.error("missing LaTeX template at %s", TEMPLATE_PATH)
+        return None
+    return TEMPLATE_PATH.read_text(encoding="utf-8")
+
+
 @app.post("/api/resume/{doc_id}/export")
 @app.post("/resume/{doc_id}/export")
 async def export_resume(doc_id: str):
     # Load draft if it exists, else parsed
-    draft_key = f"draft/{doc_id}/resume.json"
-    parsed_key = f"parsed/{doc_id}/resume.json"
-
     try:
-        raw = get_object_bytes(draft_key)
-        source_key = draft_key
-    except Exception:
-        try:
-            raw = get_object_bytes(parsed_key)
-            source_key = parsed_key
-        except Exception as exc:
-            raise HTTPException(
-                status_code=404,
-                detail=(
-                    "No parsed resume found for this document. Upload and parse a resume "
-                    "before exporting."
-                ),
-            ) from exc
-
-    resume_json = json.loads(raw.decode("utf-8", errors="replace"))
-
-    # Load template.tex from disk
-    template_path = Path(__file__).parent / "latex" / "template.tex"
-    if not template_path.exists():
+        resume, source_key = await _load_latest_resume(doc_id)
+    except Exception as exc:
+        raise HTTPException(
+            status_code=404,
+            detail=(
+                "No parsed resume found for this document. Upload and parse a resume "
+                "before exporting."
+            ),
+        ) from exc
+
+    # template.tex (read from disk once per process)
+    template_tex = _template_tex()
+    if template_tex is None:
         return {
             "error": "Missing template.tex",
-            "expected_path": str(template_path),
+            "expected_path": str(TEMPLATE_PATH),
             "used_resume_key": source_key,
         }
 
-    template_tex = template_path.read_text(encoding="utf-8")
-    rendered_tex = render_resume_to_latex(Resume.model_validate(resume_json), template_tex)
+    rendered_tex = render_resume_to_latex(resume, template_tex)
 
     # Zip it in-memory
     buf = io.BytesIO()
-    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as z:
-        z.writestr("resume.json", json.dumps(resume_json, indent=2))
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as z:
+        z.writestr("resume.json", resume.model_dump_json(indent=2))
         z.writestr("resume.tex", rendered_tex)
 
-    buf.seek(0)
-
     export_key = f"exports/{doc_id}/resume_bundle.zip"
-    put_object(export_key, buf.read(), "application/zip")
+    await aput_object(export_key, buf.getvalue(), "application/zip")
 
     url = presigned_get_url(export_key, expires_seconds=3600)
 
@@ -451,50 +608,28 @@ async def jobs_search(req: JobSearchRequest):
         limit=fetch_limit,
     )
 
-    mapped = [map_job(j) for j in raw_jobs]
+    # Map lazily so rows past the final limit are never normalized.
+    mapped = (map_job(j) for j in raw_jobs)
 
     # Local location filter (expects canonical "City, ST" from JobSearchRequest validator)
 
     # Enforce final limit after local filtering
-    mapped = mapped[: req.limit]
-
+    mapped = islice(mapped, req.limit)
 
+    # Plain dicts: FastAPI validates the payload against response_model on the way
+    # out, so building JobResult models here would validate every row twice.
     results = [
-        JobResult(
-            job_id=str(j.get("job_id", "")),
-            job_title=j.get("job_title") or "",
-            company=j.get("company") or "",
-            location=j.get("location") or "",
-            salary=j.get("salary"),
-            apply_url=j.get("apply_url"),
-            description=j.get("description"),
-            date_posted=j.get("date_posted"),
-        )   
+        {
+            "job_id": str(j.get("job_id", "")),
+            "job_title": j.get("job_title") or "",
+            "company": j.get("company") or "",
+            "location": j.get("location") or "",
+            "salary": j.get("salary"),
+            "apply_url": j.get("apply_url"),
+            "description": j.get("description"),
+            "date_posted": j.get("date_posted"),
+        }
         for j in mapped
     ]
 
-    return JobSearchResponse(role=req.role, results=results)
-
-
-# this allows the front end deployer to connect
-from fastapi.middleware.cors import CORSMiddleware
-
-def _cors_origins_from_env() -> List[str]:
-    configured = os.getenv("FRONTEND_ORIGINS", "").strip()
-    if configured:
-        origins = [o.strip().rstrip("/") for o in configured.split(",") if o.strip()]
-        if origins:
-            return origins
-    return [
-        "http://localhost:5173",
-        "http://localhost:3000",
-        "https://seamstress-m6lai.ondigitalocean.app",
-    ]
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=_cors_origins_from_env(),
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
\ No newline at end of file
+    return {"role": req.role, "results": results}
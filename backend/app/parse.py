@@ -1,40 +1,69 @@
+import asyncio
+import zipfile
 from fastapi import UploadFile, HTTPException
 from docx import Document
+from docx.opc.exceptions import PackageNotFoundError
 import pdfplumber
-import tempfile
-import os
+from pdfminer.pdftypes import PDFException
+from pdfminer.psparser import PSException
+from typing import BinaryIO
 
+PDF_MAGIC = b"%PDF-"
+ZIP_MAGIC = b"PK\x03\x04"  # .docx is a zip container
+DOCX_PART = "word/document.xml"
+UNSUPPORTED_DETAIL = "Unsupported file type. Upload PDF or DOCX."
+
+# What the extractors raise on a truncated PDF or a zip that is not a Word document
+# (.xlsx, .pptx, .odt, plain archives).
+_UNREADABLE_ERRORS = (
+    PDFException,
+    PSException,
+    PackageNotFoundError,
+    zipfile.BadZipFile,
+    KeyError,
+    ValueError,
+)
 
-def extract_text_from_pdf_bytes(data: bytes) -> str:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        tmp.write(data)
-        path = tmp.name
-    try:
-        parts = []
-        with pdfplumber.open(path) as pdf:
-            for page in pdf.pages:
-                parts.append(page.extract_text() or "")
-        return "\n".join(parts).strip()
-    finally:
-        os.unlink(path)
-def extract_text_from_docx_bytes(data: bytes) -> str:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp:
-        tmp.write(data)
-        path = tmp.name
-    try:
-        d = Document(path)
-        return "\n".join(p.text for p in d.paragraphs).strip()
-    finally:
-        os.unlink(path)
 
+def extract_text_from_pdf(fp: BinaryIO) -> str:
+    parts = []
+    with pdfplumber.open(fp) as pdf:
+        for page in pdf.pages:
+            parts.append(page.extract_text() or "")
+    return "\n".join(parts).strip()
+def extract_text_from_docx(fp: BinaryIO) -> str:
+    # Any zip passes the magic check; only hand Word documents to python-docx.
+    with zipfile.ZipFile(fp) as zf:
+        if DOCX_PART not in zf.namelist():
+            raise ValueError("zip archive is not a .docx document")
+    fp.seek(0)
+    d = Document(fp)
+    return "\n".join(p.text for p in d.paragraphs).strip()
 
-async def extract_text(upload: UploadFile) -> tuple[str, bytes]:
-    filename = (upload.filename or "").lower()
-    data = await upload.read()
 
-    if filename.endswith(".pdf"):
-        return extract_text_from_pdf_bytes(data), data
-    if filename.endswith(".docx"):
-        return extract_text_from_docx_bytes(data), data
+async def extract_text(upload: UploadFile) -> tuple[str, BinaryIO]:
+    """
+    Returns (text, fileobj). The upload's spooled file is read in place rather than
+    copied into memory, and handed back rewound so it can be streamed to storage.
+    The type is decided by the file's leading bytes, not its name.
+    """
+    fp = upload.file
+    fp.seek(0)
+    head = fp.read(5)
+    fp.seek(0)
+
+    # Parsing is CPU-bound; run it in a worker thread so other requests keep moving.
+    if head == PDF_MAGIC:
+        extractor = extract_text_from_pdf
+    elif head.startswith(ZIP_MAGIC):
+        extractor = extract_text_from_docx
+    else:
+        raise HTTPException(status_code=400, detail=UNSUPPORTED_DETAIL)
+
+    try:
+        text = await asyncio.to_thread(extractor, fp)
+    except _UNREADABLE_ERRORS:
+        raise HTTPException(status_code=400, detail=UNSUPPORTED_DETAIL)
 
-    raise HTTPException(status_code=400, detail="Unsupported file type. Upload PDF or DOCX.")
\ No newline at end of file
+    fp.seek(0)
+    return text, fp
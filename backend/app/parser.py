@@ -6,12 +6,14 @@ from .llm import parse_resume_with_llm
 EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
 PHONE_RE = re.compile(r"(\+?1[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}")
 
-def parse_resume_text(raw: str) -> Resume:
+async def parse_resume_text(raw: str) -> Resume:
     lines = [ln.strip() for ln in raw.splitlines() if ln.strip()]
     text = "\n".join(lines)
 
-    email = EMAIL_RE.search(text).group(0) if EMAIL_RE.search(text) else ""
-    phone = PHONE_RE.search(text).group(0) if PHONE_RE.search(text) else ""
+    email_match = EMAIL_RE.search(text)
+    phone_match = PHONE_RE.search(text)
+    email = email_match.group(0) if email_match else ""
+    phone = phone_match.group(0) if phone_match else ""
     name = lines[0] if lines else ""
 
     seed_resume = {
@@ -33,7 +35,7 @@ def parse_resume_text(raw: str) -> Resume:
     }
 
     try:
-        return parse_resume_with_llm(text, seed_resume)
+        return await parse_resume_with_llm(text, seed_resume)
     except Exception:
         # Heuristic fallback if LLM parsing is unavailable
         return Resume.model_validate(seed_resume)
\ No newline at end of file
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import re
 from typing import Iterable, List
 
 from .resume_schema import Resume
@@ -19,15 +20,22 @@ LATEX_REPLACEMENTS = {
 }
 
 
+_PLACEHOLDER_RE = re.compile(r"\{\{(\w+)\}\}")
+
+# One-pass translation table; replacements are never rescanned, so the backslash
+# needs no special ordering.
+_LATEX_TRANSLATE = str.maketrans(LATEX_REPLACEMENTS)
+# Most header/date/company fields have nothing to escape; returning them as-is
+# skips the copy translate() would otherwise make.
+_LATEX_SPECIALS_RE = re.compile(r"[&%$#_{}~^\\]")
+
+
 def _escape_latex(text: str) -> str:
 	if not text:
 		return ""
-	escaped = text.replace("\\", LATEX_REPLACEMENTS["\\"])
-	for key, value in LATEX_REPLACEMENTS.items():
-		if key == "\\":
-			continue
-		escaped = escaped.replace(key, value)
-	return escaped
+	if not _LATEX_SPECIALS_RE.search(text):
+		return text
+	return text.translate(_LATEX_TRANSLATE)
 
 
 def _normalize_url(url: str) -> str:
@@ -43,14 +51,17 @@ def _join_non_empty(parts: Iterable[str], sep: str = " \\quad ") -> str:
 	return sep.join(cleaned)
 
 
+def _join_escaped(items: Iterable[str], sep: str = ", ") -> str:
+	return sep.join(map(_escape_latex, items))
+
+
 def _format_itemize(items: List[str]) -> str:
-	cleaned = [_escape_latex(item) for item in items if item.strip()]
+	if not items:
+		return ""
+	cleaned = [f"    \\item {_escape_latex(item)}" for item in items if item.strip()]
 	if not cleaned:
 		return ""
-	lines = ["\\begin{itemize}"]
-	lines.extend([f"    \\item {item}" for item in cleaned])
-	lines.append("\\end{itemize}")
-	return "\n".join(lines)
+	return "\n".join(["\\begin{itemize}", *cleaned, "\\end{itemize}"])
 
 
 def _gpa_should_show(gpa: str) -> bool:
@@ -207,13 +218,13 @@ def _render_skills(resume: Resume) -> str:
     lines = []
 
     if skills.languages:
-        lines.append(f"\\textbf{{Programming Languages:}} {', '.join(_escape_latex(s) for s in skills.languages)}")
+        lines.append(f"\\textbf{{Programming Languages:}} {_join_escaped(skills.languages)}")
     if skills.frameworks:
-        lines.append(f"\\textbf{{Frameworks:}} {', '.join(_escape_latex(s) for s in skills.frameworks)}")
+        lines.append(f"\\textbf{{Frameworks:}} {_join_escaped(skills.frameworks)}")
     if skills.tools:
-        lines.append(f"\\textbf{{Tools:}} {', '.join(_escape_latex(s) for s in skills.tools)}")
+        lines.append(f"\\textbf{{Tools:}} {_join_escaped(skills.tools)}")
     if skills.concepts:
-        lines.append(f"\\textbf{{Concepts:}} {', '.join(_escape_latex(s) for s in skills.concepts)}")
+        lines.append(f"\\textbf{{Concepts:}} {_join_escaped(skills.concepts)}")
 
     for label, items in (skills.categories or {}).items():
         cleaned = [_escape_latex(x) for x in items if x.strip()]
@@ -278,8 +289,10 @@ def _render_extracurriculars(resume: Resume) -> str:
 
 
 def _render_awards(resume: Resume) -> str:
-	awards = [award for award in resume.awards if award.strip()]
-	return _section("Awards", _format_itemize(awards))
+	if not resume.awards:
+		return ""
+	# _format_itemize already drops blank entries.
+	return _section("Awards", _format_itemize(resume.awards))
 
 
 def render_resume_to_latex(resume: Resume, template_tex: str) -> str:
@@ -294,8 +307,8 @@ def render_resume_to_latex(resume: Resume, template_tex: str) -> str:
 		"EXTRACURRICULARS_BLOCK": _render_extracurriculars(resume),
 	}
 
-	rendered = template_tex
-	for key, value in replacements.items():
-		rendered = rendered.replace(f"{{{{{key}}}}}", value.strip())
-
-	return rendered
+	# One scan of the template; unknown placeholders are left as they are.
+	return _PLACEHOLDER_RE.sub(
+		lambda m: replacements[m.group(1)].strip() if m.group(1) in replacements else m.group(0),
+		template_tex,
+	)
@@ -1,22 +1,41 @@
 import os
+import asyncio
+from datetime import datetime
+from functools import lru_cache
+from typing import IO, Optional, Tuple, Union
+
 import boto3
 from botocore.client import Config
+from botocore.exceptions import ClientError
 
 
+@lru_cache(maxsize=1)
 def s3_client():
-    return boto3.client(
+    # Building a client (endpoint resolution, credential and service model loading)
+    # costs milliseconds; one client is thread-safe and keeps its connections warm.
+    # Its own Session avoids sharing boto3's default session across worker threads.
+    return boto3.session.Session().client(
         "s3",
         region_name=os.environ["DO_SPACES_REGION"],
         endpoint_url=os.environ["DO_SPACES_ENDPOINT"],
         aws_access_key_id=os.environ["DO_SPACES_KEY"],
         aws_secret_access_key=os.environ["DO_SPACES_SECRET"],
-        config=Config(signature_version="s3v4"),
+        config=Config(signature_version="s3v4", max_pool_connections=32),
     )
 
 
-def put_object(key: str, data: bytes, content_type: str):
+def put_object(key: str, data: Union[bytes, IO[bytes]], content_type: str):
     bucket = os.environ["DO_SPACES_BUCKET"]
     s3 = s3_client()
+    if not isinstance(data, (bytes, bytearray)):
+        # File-like bodies are streamed in parts instead of being read into memory.
+        s3.upload_fileobj(
+            data,
+            bucket,
+            key,
+            ExtraArgs={"ACL": "private", "ContentType": content_type},
+        )
+        return
     s3.put_object(
         Bucket=bucket,
         Key=key,
@@ -26,6 +45,11 @@ def put_object(key: str, data: bytes, content_type: str):
     )
 
 
+async def aput_object(key: str, data: Union[bytes, IO[bytes]], content_type: str):
+    # boto3 is blocking; run it in a worker thread so concurrent writes overlap.
+    await asyncio.to_thread(put_object, key, data, content_type)
+
+
 def presigned_get_url(key: str, expires_seconds: int = 3600) -> str:
     bucket = os.environ["DO_SPACES_BUCKET"]
     s3 = s3_client()
@@ -38,4 +62,33 @@ def get_object_bytes(key: str) -> bytes:
     bucket = os.environ["DO_SPACES_BUCKET"]
     s3 = s3_client()
     obj = s3.get_object(Bucket=bucket, Key=key)
-    return obj["Body"].read()
\ No newline at end of file
+    return obj["Body"].read()
+
+
+def get_object_with_mtime(key: str) -> Tuple[bytes, datetime]:
+    """
+    Returns (body, last_modified) so callers can age out stale objects themselves.
+    """
+    bucket = os.environ["DO_SPACES_BUCKET"]
+    s3 = s3_client()
+    obj = s3.get_object(Bucket=bucket, Key=key)
+    return obj["Body"].read(), obj["LastModified"]
+
+
+def get_object(key: str, if_none_match: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+    """
+    Conditional GET. Returns (body, etag), or (None, etag) when the stored object
+    still matches `if_none_match` and the body was not transferred.
+    """
+    bucket = os.environ["DO_SPACES_BUCKET"]
+    s3 = s3_client()
+    params = {"Bucket": bucket, "Key": key}
+    if if_none_match:
+        params["IfNoneMatch"] = if_none_match
+    try:
+        obj = s3.get_object(**params)
+    except ClientError as e:
+        if if_none_match and e.response.get("Error", {}).get("Code") in ("304", "NotModified"):
+            return None, if_none_match
+        raise
+    return obj["Body"].read(), obj.get("ETag", "")
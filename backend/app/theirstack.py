@@ -1,12 +1,45 @@
 import os
-from typing import Any, Dict, List, Optional
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
+import orjson
 from fastapi import HTTPException
 
 THEIRSTACK_BASE = "https://api.theirstack.com"
 
+# One pooled client for the process so TheirStack calls reuse warm connections.
+_HTTP: Optional[httpx.AsyncClient] = None
 
+
+def _http() -> httpx.AsyncClient:
+    global _HTTP
+    if _HTTP is None or _HTTP.is_closed:
+        _HTTP = httpx.AsyncClient(base_url=THEIRSTACK_BASE, timeout=30)
+    return _HTTP
+
+
+async def aclose() -> None:
+    """
+    Close the shared HTTP client (called on app shutdown).
+    """
+    global _HTTP
+    if _HTTP is not None:
+        await _HTTP.aclose()
+        _HTTP = None
+
+
+# Recent search results, keyed by the request filters. The same role/salary search
+# is often repeated within minutes, and each TheirStack call costs credits.
+_SEARCH_CACHE: "OrderedDict[Tuple[str, Optional[int], int], Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+_SEARCH_CACHE_MAX = 64
+_SEARCH_CACHE_TTL = 120.0
+
+
+# Built once; a missing key raises and is not cached, so it is re-checked next call.
+@lru_cache(maxsize=1)
 def _auth_headers() -> Dict[str, str]:
     key = os.getenv("THEIRSTACK_API_KEY")
     if not key:
@@ -49,6 +82,12 @@ async def search_jobs(
     - US-only (we do NOT send country filters).
     """
 
+    cache_key = (query, min_salary_usd, limit)
+    entry = _SEARCH_CACHE.get(cache_key)
+    if entry is not None and time.monotonic() - entry[0] <= _SEARCH_CACHE_TTL:
+        _SEARCH_CACHE.move_to_end(cache_key)
+        return entry[1]
+
     payload: Dict[str, Any] = {
         "limit": limit,
         "posted_at_max_age_days": 14,
@@ -60,18 +99,17 @@ async def search_jobs(
     if min_salary_usd is not None:
         payload["min_salary_usd"] = min_salary_usd
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        r = await client.post(
-            f"{THEIRSTACK_BASE}/v1/jobs/search",
-            headers=_auth_headers(),
-            json=payload,
-        )
+    r = await _http().post(
+        "/v1/jobs/search",
+        headers=_auth_headers(),
+        json=payload,
+    )
 
     if r.status_code >= 400:
         # Surface TheirStack's actual validation errors
         raise HTTPException(status_code=r.status_code, detail=r.text)
 
-    data = r.json()
+    data = orjson.loads(r.content)
 
     # TheirStack sometimes returns different keys
     jobs = None
@@ -83,7 +121,12 @@ async def search_jobs(
         )
 
     if not jobs:
-        return []
+        jobs = []
+
+    _SEARCH_CACHE[cache_key] = (time.monotonic(), jobs)
+    _SEARCH_CACHE.move_to_end(cache_key)
+    while len(_SEARCH_CACHE) > _SEARCH_CACHE_MAX:
+        _SEARCH_CACHE.popitem(last=False)
 
     return jobs
 